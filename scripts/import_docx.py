@@ -2,104 +2,139 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import functools
 import json
 import re
 import sys
 import zipfile
 from pathlib import Path
-from typing import Dict, List, Tuple
-from xml.etree import ElementTree as ET
+from typing import IO, Dict, Iterator, List, Tuple
+
+try:
+    # lxml 基于 libxml2，可在 C 层按标签过滤，解析大文档明显更快
+    from lxml import etree as ET
+
+    HAS_LXML = True
+except ImportError:  # 未安装 lxml 时退回标准库
+    from xml.etree import ElementTree as ET
+
+    HAS_LXML = False
+
+try:
+    # orjson 直接输出 UTF-8 字节，序列化速度远快于标准库 json
+    import orjson
+except ImportError:  # 未安装 orjson 时退回标准库
+    orjson = None
 
 NS = {"w": "http://schemas.openxmlformats.org/wordprocessingml/2006/main"}
+W_T_TAG = f"{{{NS['w']}}}t"
 
-HEADER_WORDS = {"证型", "证候", "证机概要", "治法", "方药"}
-NOISE_PATTERNS = [
-    re.compile(r"微信公众号"),
-    re.compile(r"医心执考"),
-]
+HEADER_WORDS = frozenset(sys.intern(word) for word in ("证型", "证候", "证机概要", "治法", "方药"))
+NOISE_RE = re.compile(r"微信公众号|医心执考")
 PRESCRIPTION_HINTS = ("汤", "散", "饮", "丸", "方", "颗粒", "合")
 TREATMENT_HINTS = ("解表", "止咳", "宣肺", "清热", "祛湿", "化痰", "滋阴", "益气", "温", "补", "活血", "通络")
+PRESCRIPTION_RE = re.compile("|".join(map(re.escape, PRESCRIPTION_HINTS)))
+TREATMENT_RE = re.compile("|".join(map(re.escape, TREATMENT_HINTS)))
 DISEASE_TITLE_RE = re.compile(r"^考点\s*(\d+)[★☆\s]*(.+)$")
 PULSE_RE = re.compile(r"(脉[^，。；;]*)")
+SHORT_CN_RE = re.compile(r"[一-龥A-Za-z0-9]+")
+TITLE_HEAD_RE = re.compile(r"([一-龥A-Za-z0-9]+)")
+TITLE_PAREN_RE = re.compile(r"[（(].*?[）)]")
+# 全角空格与半角空格一次性删除
+CLEAN_TRANS = str.maketrans("", "", "\u3000 ")
+# 症状分隔符统一替换为全角逗号，再用 str.split 切分
+SYMPTOM_SEP_TRANS = str.maketrans({sep: "，" for sep in ",、；;。"})
 
 
 def clean_text(text: str) -> str:
-    text = text.replace("\u3000", "")
-    text = text.replace(" ", "")
-    text = text.strip()
-    return text
-
-
-def read_docx_text_nodes(docx_path: Path) -> List[str]:
-    with zipfile.ZipFile(docx_path) as zf:
-        xml_data = zf.read("word/document.xml")
-    root = ET.fromstring(xml_data)
-    nodes = []
-    for node in root.findall(".//w:t", NS):
-        text = clean_text(node.text or "")
-        if text:
-            nodes.append(text)
-    return nodes
+    return text.translate(CLEAN_TRANS).strip()
+
+
+def _iter_w_t_lxml(fp: IO[bytes]) -> Iterator[str]:
+    for _, elem in ET.iterparse(fp, events=("end",), tag=W_T_TAG):
+        yield elem.text or ""
+        elem.clear(keep_tail=True)
+        # 释放已处理的兄弟节点，避免整棵树在内存中累积
+        for ancestor in elem.iterancestors():
+            while ancestor.getprevious() is not None:
+                del ancestor.getparent()[0]
+
+
+def _iter_w_t_stdlib(fp: IO[bytes]) -> Iterator[str]:
+    depth = 0
+    body = None
+    for event, elem in ET.iterparse(fp, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if depth == 2:
+                body = elem
+            continue
+        depth -= 1
+        if elem.tag == W_T_TAG:
+            yield elem.text or ""
+            elem.clear()
+        elif depth == 2 and body is not None:
+            # body 的直接子元素（段落、表格）处理完毕，释放已解析的部分
+            del body[:]
 
 
 def is_noise(line: str) -> bool:
-    return any(pattern.search(line) for pattern in NOISE_PATTERNS)
+    return NOISE_RE.search(line) is not None
 
 
-def normalize_lines(lines: List[str]) -> List[str]:
-    result: List[str] = []
-    for line in lines:
-        line = clean_text(line)
-        if not line:
-            continue
-        if is_noise(line):
-            continue
-        result.append(line)
-    return result
+def iter_docx_lines(docx_path: Path) -> Iterator[str]:
+    iter_w_t = _iter_w_t_lxml if HAS_LXML else _iter_w_t_stdlib
+    # 流式解析 document.xml，边解析边清洗、过滤，不保留原始文本节点列表
+    with zipfile.ZipFile(docx_path) as zf, zf.open("word/document.xml") as fp:
+        for raw in iter_w_t(fp):
+            line = clean_text(raw)
+            if not line:
+                continue
+            if is_noise(line):
+                continue
+            # 重复出现的表头、短词共享同一对象，集合查找可走指针相等的快速路径
+            yield sys.intern(line)
 
 
 def extract_disease_name(title_tail: str) -> str:
     # 去掉括号说明
-    title = re.sub(r"[（(].*?[）)]", "", title_tail)
+    title = TITLE_PAREN_RE.sub("", title_tail)
     title = title.replace("★", "").strip()
     # 防止标题后面夹杂额外描述
-    m = re.match(r"^([一-龥A-Za-z0-9]+)", title)
+    m = TITLE_HEAD_RE.match(title)
     return m.group(1) if m else title
 
 
+@functools.lru_cache(maxsize=4096)
 def is_short_cn(line: str) -> bool:
-    return len(line) <= 8 and re.fullmatch(r"[一-龥A-Za-z0-9]+", line) is not None
+    return len(line) <= 8 and SHORT_CN_RE.fullmatch(line) is not None
 
 
+@functools.lru_cache(maxsize=4096)
 def looks_like_prescription(line: str) -> bool:
-    return any(hint in line for hint in PRESCRIPTION_HINTS)
+    return PRESCRIPTION_RE.search(line) is not None
 
 
+@functools.lru_cache(maxsize=4096)
 def looks_like_treatment(line: str) -> bool:
-    return len(line) <= 16 and any(hint in line for hint in TREATMENT_HINTS)
+    return len(line) <= 16 and TREATMENT_RE.search(line) is not None
 
 
 def looks_like_new_disease(line: str) -> bool:
     return DISEASE_TITLE_RE.match(line) is not None
 
 
-def could_be_new_syndrome(lines: List[str], idx: int) -> bool:
-    if idx >= len(lines):
-        return False
-    token = lines[idx]
-    if token in HEADER_WORDS:
-        return False
-    if not is_short_cn(token):
-        return False
-    if looks_like_treatment(token) or looks_like_prescription(token):
-        return False
-    if idx + 1 < len(lines):
-        nxt = lines[idx + 1]
-        if "，" in nxt or "。" in nxt:
-            return True
-        if is_short_cn(nxt):
-            return True
-    return False
+def mark_new_syndromes(
+    header: List[bool], short: List[bool], treat: List[bool], rx: List[bool], punct: List[bool]
+) -> List[bool]:
+    # 第 i 行是否可能是新证型名：短词、非表头/治法/方药，且下一行为症状句或短词
+    n = len(short)
+    result = [False] * n
+    for idx in range(n - 1):
+        if header[idx] or not short[idx] or treat[idx] or rx[idx]:
+            continue
+        result[idx] = punct[idx + 1] or short[idx + 1]
+    return result
 
 
 def split_prescription(text: str) -> Tuple[str, str | None]:
@@ -112,14 +147,13 @@ def split_prescription(text: str) -> Tuple[str, str | None]:
 
 
 def to_symptom_items(symptoms_text: str) -> List[Dict[str, object]]:
-    raw_items = re.split(r"[，,、；;。]", symptoms_text)
+    raw_items = symptoms_text.translate(SYMPTOM_SEP_TRANS).split("，")
     cleaned = [item.strip() for item in raw_items if item.strip()]
     if not cleaned:
         return [{"text": "待补充", "is_key": True}]
-    items: List[Dict[str, object]] = []
-    for idx, item in enumerate(cleaned):
-        items.append({"text": item, "is_key": idx < min(3, len(cleaned))})
-    return items
+    # 前三项标记为关键症状
+    threshold = min(3, len(cleaned))
+    return [{"text": item, "is_key": idx < threshold} for idx, item in enumerate(cleaned)]
 
 
 def parse_disease_sections(lines: List[str]) -> List[Tuple[str, List[str]]]:
@@ -145,44 +179,52 @@ def parse_disease_sections(lines: List[str]) -> List[Tuple[str, List[str]]]:
 
 def parse_syndromes_for_disease(disease_name: str, lines: List[str], warnings: List[str]) -> List[Dict[str, object]]:
     result: List[Dict[str, object]] = []
+    n = len(lines)
+    # 每行的分类结果只计算一次，后续各阶段按下标查表
+    header = [line in HEADER_WORDS for line in lines]
+    short = [is_short_cn(line) for line in lines]
+    treat = [looks_like_treatment(line) for line in lines]
+    rx = [looks_like_prescription(line) for line in lines]
+    new_dis = [looks_like_new_disease(line) for line in lines]
+    period = ["。" in line for line in lines]
+    punct = [p or "，" in line for p, line in zip(period, lines)]
+    new_syn = mark_new_syndromes(header, short, treat, rx, punct)
     i = 0
 
-    while i < len(lines):
-        line = lines[i]
-        if line in HEADER_WORDS or looks_like_new_disease(line):
+    while i < n:
+        if header[i] or new_dis[i]:
             i += 1
             continue
-        if line.startswith("考点"):
+        if lines[i].startswith("考点"):
             i += 1
             continue
-        if not could_be_new_syndrome(lines, i):
+        if not new_syn[i]:
             i += 1
             continue
 
         syndrome_name_parts = [lines[i]]
         i += 1
-        while i < len(lines) and is_short_cn(lines[i]) and len(syndrome_name_parts) < 3:
-            if lines[i] in HEADER_WORDS or looks_like_treatment(lines[i]) or looks_like_prescription(lines[i]):
+        while i < n and short[i] and len(syndrome_name_parts) < 3:
+            if header[i] or treat[i] or rx[i]:
                 break
             syndrome_name_parts.append(lines[i])
             i += 1
-            if i < len(lines) and ("，" in lines[i] or "。" in lines[i]):
+            if i < n and punct[i]:
                 break
         syndrome_name = "".join(syndrome_name_parts)
 
         symptom_parts: List[str] = []
-        while i < len(lines):
-            token = lines[i]
-            if token in HEADER_WORDS:
+        while i < n:
+            if header[i]:
                 i += 1
                 continue
-            if looks_like_new_disease(token):
+            if new_dis[i]:
                 break
-            if could_be_new_syndrome(lines, i) and symptom_parts:
+            if new_syn[i] and symptom_parts:
                 break
-            symptom_parts.append(token)
+            symptom_parts.append(lines[i])
             i += 1
-            if "。" in token:
+            if period[i - 1]:
                 break
 
         if not symptom_parts:
@@ -191,57 +233,63 @@ def parse_syndromes_for_disease(disease_name: str, lines: List[str], warnings: L
         symptoms_full = "".join(symptom_parts).strip()
         if not symptoms_full:
             symptoms_full = "待补充"
+        pulse_match = PULSE_RE.search(symptoms_full)
+        pulse = pulse_match.group(1) if pulse_match else "待补充"
 
         patho_parts: List[str] = []
-        while i < len(lines):
-            token = lines[i]
-            if token in HEADER_WORDS:
+        patho_len = 0
+        while i < n:
+            if header[i]:
                 i += 1
                 continue
-            if looks_like_treatment(token) and patho_parts:
+            if treat[i] and patho_parts:
                 break
-            if looks_like_new_disease(token) or could_be_new_syndrome(lines, i):
+            if new_dis[i] or new_syn[i]:
                 break
-            patho_parts.append(token)
+            patho_parts.append(lines[i])
+            patho_len += len(lines[i])
             i += 1
-            if "。" in token and len("".join(patho_parts)) >= 6:
+            if period[i - 1] and patho_len >= 6:
                 break
         pathogenesis = "".join(patho_parts).strip() or "待补充"
 
         treatment_parts: List[str] = []
-        while i < len(lines):
-            token = lines[i]
-            if token in HEADER_WORDS:
+        treatment_len = 0
+        while i < n:
+            if header[i]:
                 i += 1
                 continue
-            if looks_like_prescription(token):
+            if rx[i]:
                 break
-            if looks_like_new_disease(token) or could_be_new_syndrome(lines, i):
+            if new_dis[i] or new_syn[i]:
                 break
-            treatment_parts.append(token)
+            treatment_parts.append(lines[i])
+            treatment_len += len(lines[i])
             i += 1
-            if len("".join(treatment_parts)) >= 12:
+            if treatment_len >= 12:
                 break
         treatment = "".join(treatment_parts).strip() or "待补充"
 
         prescription_parts: List[str] = []
-        while i < len(lines):
-            token = lines[i]
-            if token in HEADER_WORDS:
+        # 方药最多取三段，直接累加字符串，免去每轮重新 join
+        prescription_joined = ""
+        while i < n:
+            if header[i]:
                 i += 1
                 continue
-            if looks_like_new_disease(token):
+            if new_dis[i]:
                 break
-            if could_be_new_syndrome(lines, i):
+            if new_syn[i]:
                 break
-            prescription_parts.append(token)
+            prescription_parts.append(lines[i])
+            prescription_joined += lines[i]
             i += 1
             if len(prescription_parts) >= 3:
                 break
-            if looks_like_prescription("".join(prescription_parts)):
-                if i < len(lines) and could_be_new_syndrome(lines, i):
+            if looks_like_prescription(prescription_joined):
+                if i < n and new_syn[i]:
                     break
-        prescription_text = "".join(prescription_parts).strip() or "待补充方药"
+        prescription_text = prescription_joined.strip() or "待补充方药"
         prescription_primary, prescription_alternative = split_prescription(prescription_text)
         if not prescription_primary:
             prescription_primary = "待补充方药"
@@ -260,6 +308,8 @@ def parse_syndromes_for_disease(disease_name: str, lines: List[str], warnings: L
                     "alternative": prescription_alternative,
                 },
                 "key_symptom_analysis": [],
+                # 仅供 build_dataset 使用，不写入输出
+                "_pulse": pulse,
             }
         )
 
@@ -286,11 +336,6 @@ def build_dataset(sections: List[Tuple[str, List[str]]]) -> Tuple[List[Dict[str,
             syndrome_id = f"{disease_id}_S{idx:02d}"
             syndrome_ids.append(syndrome_id)
 
-            full_text = syndrome["symptoms"]["full_text"]
-            pulse_match = PULSE_RE.search(full_text)
-            pulse_text = pulse_match.group(1) if pulse_match else "待补充"
-            _ = pulse_text
-
             syndromes.append(
                 {
                     "syndrome_id": syndrome_id,
@@ -306,10 +351,7 @@ def build_dataset(sections: List[Tuple[str, List[str]]]) -> Tuple[List[Dict[str,
 
         first_items = parsed_syndromes[0]["symptoms"]["items"]
         key_symptoms = "、".join(item["text"] for item in first_items[:2]) if first_items else "待补充"
-        pulse = "待补充"
-        pulse_match = PULSE_RE.search(parsed_syndromes[0]["symptoms"]["full_text"])
-        if pulse_match:
-            pulse = pulse_match.group(1)
+        pulse = parsed_syndromes[0]["_pulse"]
 
         diseases.append(
             {
@@ -326,6 +368,25 @@ def build_dataset(sections: List[Tuple[str, List[str]]]) -> Tuple[List[Dict[str,
     return diseases, syndromes, warnings
 
 
+def dump_json(data: object) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def write_json(path: Path, data: object) -> None:
+    if not isinstance(data, list) or not data:
+        path.write_bytes(dump_json(data))
+        return
+    # 顶层列表逐条序列化写入，避免整份 JSON 同时驻留内存；输出与 indent=2 一致
+    with path.open("wb") as fp:
+        fp.write(b"[")
+        for idx, item in enumerate(data):
+            fp.write(b",\n  " if idx else b"\n  ")
+            fp.write(dump_json(item).replace(b"\n", b"\n  "))
+        fp.write(b"\n]")
+
+
 def main() -> int:
     if len(sys.argv) < 3:
         print("用法: python scripts/import_docx.py <docx_path> <output_dir>")
@@ -339,7 +400,7 @@ def main() -> int:
         print(f"文件不存在: {docx_path}")
         return 1
 
-    lines = normalize_lines(read_docx_text_nodes(docx_path))
+    lines = list(iter_docx_lines(docx_path))
     sections = parse_disease_sections(lines)
     diseases, syndromes, warnings = build_dataset(sections)
 
@@ -347,20 +408,16 @@ def main() -> int:
     syndromes_path = output_dir / "syndromes.json"
     report_path = output_dir / "report.json"
 
-    diseases_path.write_text(json.dumps(diseases, ensure_ascii=False, indent=2), encoding="utf-8")
-    syndromes_path.write_text(json.dumps(syndromes, ensure_ascii=False, indent=2), encoding="utf-8")
-    report_path.write_text(
-        json.dumps(
-            {
-                "source": str(docx_path),
-                "disease_count": len(diseases),
-                "syndrome_count": len(syndromes),
-                "warnings": warnings,
-            },
-            ensure_ascii=False,
-            indent=2,
-        ),
-        encoding="utf-8",
+    write_json(diseases_path, diseases)
+    write_json(syndromes_path, syndromes)
+    write_json(
+        report_path,
+        {
+            "source": str(docx_path),
+            "disease_count": len(diseases),
+            "syndrome_count": len(syndromes),
+            "warnings": warnings,
+        },
     )
 
     print(f"导入完成: {docx_path.name}")